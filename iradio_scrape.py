@@ -3,18 +3,34 @@
 
 import argparse
 import datetime as dt
+import functools
+import hashlib
+import itertools
+import json
+import operator
 import re
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+try:  # 選用：有 pyarrow 時讀 CSV 較快，也是 --format parquet 所需
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
 BASE_URL = "https://www.bcc.com.tw/news3_search.asp"
 
 HEADERS = {
@@ -27,44 +43,117 @@ HEADERS = {
     "Connection": "keep-alive",
 }
 
-DATE_MMDD_RE = re.compile(r"^\d{2}/\d{2}$")  # 例如 01/05
-TIME_RE = re.compile(r"^\d{2}:\d{2}$")       # 例如 16:27
-
-
-def fetch_content(params: dict, verify_ssl: bool = True, retries: int = 6, timeout: int = 30) -> bytes:
+# 共用連線池：同一個 host 連抓多頁時重用 TCP/TLS 連線，不必每頁重新握手；
+# 重試與退避交給 urllib3，重試時也沿用池裡的連線
+RETRY = Retry(
+    total=6,
+    backoff_factor=1.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=frozenset(["GET"]),
+    respect_retry_after_header=True,  # 429/503 帶 Retry-After 時照伺服器指定的秒數等待
+    raise_on_status=False,
+)
+ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=RETRY)
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", ADAPTER)
+SESSION.mount("http://", ADAPTER)
+
+CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+MOJIBAKE_CHARS = frozenset("ÃÂæåäèéçð")     # UTF-8 被當 latin1 解碼時常見的字元
+
+# 網站實際以 UTF-8 輸出，直接指定編碼交給 libxml2 解碼；parser 全程共用一個。
+# 不用 id 查元素，collect_ids=False 省掉 id 索引
+HTML_PARSER = lxml_html.HTMLParser(encoding="utf-8", collect_ids=False)
+# 每筆曲目 div.bxa2（class token 完全比對）底下的直屬 div 欄位，依文件順序一次取出
+CELL_XPATH = etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' bxa2 ')]/div")
+
+COLS = ("日期", "日期_mmdd", "播出時間", "歌曲名稱", "演唱(奏)者", "專輯", "出版者", "CD編號")
+DEDUPE_KEYS = ["日期", "播出時間", "歌曲名稱", "演唱(奏)者"]
+ROW_KEY = operator.itemgetter(*(COLS.index(k) for k in DEDUPE_KEYS))  # parse_page 的 tuple -> 去重 key
+
+PAGE_WINDOW = 4  # 一次並行抓取的頁數（不超過連線池大小）
+
+
+def http_cache_paths(cache_dir: Path, params: dict) -> tuple:
+    name = "_".join(f"{k}{v}" for k, v in sorted(params.items()))  # 例如 dt1_p3
+    return cache_dir / f"{name}.json", cache_dir / f"{name}.html"
+
+
+def fetch_content(
+    params: dict,
+    verify_ssl: bool = True,
+    timeout: int = 30,
+    cache_dir: Path | None = None,
+) -> tuple:
     """
-    抓取原始 bytes（避免 encoding 搞亂）。
+    抓取原始 bytes（避免 encoding 搞亂），連同伺服器回應秒數一起回傳 (content, elapsed)。
+    有 cache_dir 時帶 If-None-Match / If-Modified-Since，伺服器回 304 就直接用上次存下的內容。
     """
-    last_err = None
-    for i in range(retries):
-        try:
-            r = requests.get(
-                BASE_URL,
-                params=params,
-                headers=HEADERS,
-                timeout=timeout,
-                verify=verify_ssl,
-                allow_redirects=True,
-            )
-            if r.status_code == 200 and r.content:
-                return r.content
-            last_err = RuntimeError(f"HTTP {r.status_code}")
-        except Exception as e:
-            last_err = e
+    cond_headers = {}
+    if cache_dir is not None:
+        meta_path, body_path = http_cache_paths(cache_dir, params)
+        if meta_path.exists() and body_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("etag"):
+                cond_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                cond_headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        r = SESSION.get(
+            BASE_URL,
+            params=params,
+            headers=cond_headers,
+            timeout=timeout,
+            verify=verify_ssl,
+            allow_redirects=True,
+        )
+    except requests.RequestException as e:
+        raise RuntimeError(f"Failed to fetch {BASE_URL} params={params}. last_err={e}") from e
+
+    elapsed = r.elapsed.total_seconds()
+    if r.status_code == 304 and cond_headers:
+        return body_path.read_bytes(), elapsed
+    if r.status_code != 200 or not r.content:
+        raise RuntimeError(f"Failed to fetch {BASE_URL} params={params}. last_err=HTTP {r.status_code}")
+
+    etag = r.headers.get("ETag")
+    last_modified = r.headers.get("Last-Modified")
+    # 伺服器沒給 ETag / Last-Modified 就不快取
+    if cache_dir is not None and (etag or last_modified):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        body_path.write_bytes(r.content)
+        meta_path.write_text(json.dumps({"etag": etag, "last_modified": last_modified}), encoding="utf-8")
+    return r.content, elapsed
+
+
+# 固定 5 字元的 NN/NN、NN:NN 直接檢查，不必每格都跑 regex（isdecimal 與 \d 判定相同）
+def is_mmdd(s: str) -> bool:
+    return len(s) == 5 and s[2] == "/" and s[:2].isdecimal() and s[3:].isdecimal()  # 例如 01/05
 
-        time.sleep(1.5 * (i + 1))
 
-    raise RuntimeError(f"Failed to fetch {BASE_URL} params={params}. last_err={last_err}")
+def is_hhmm(s: str) -> bool:
+    return len(s) == 5 and s[2] == ":" and s[:2].isdecimal() and s[3:].isdecimal()  # 例如 16:27
 
 
+@functools.lru_cache(maxsize=512)
 def mmdd_to_iso(mmdd: str, base_date: dt.date) -> str:
     """
-    MM/DD -> YYYY-MM-DD（用 base_date 的年份當中心，挑最近的日期，避免跨年錯年）
+    MM/DD -> YYYY-MM-DD（用 base_date 的年份當中心：月份相差超過半年就算前/後一年，避免跨年錯年）
     """
-    m, d = map(int, mmdd.split("/"))
-    candidates = [dt.date(base_date.year + y, m, d) for y in (-1, 0, 1)]
-    best = min(candidates, key=lambda x: abs((x - base_date).days))
-    return best.isoformat()
+    m, d = int(mmdd[:2]), int(mmdd[3:5])
+    y = base_date.year
+    diff = m - base_date.month
+    if diff > 6:
+        y -= 1
+    elif diff < -6:
+        y += 1
+
+    # 02/29、04/31 之類可能不存在的日期才交給 dt.date 驗證
+    if not (1 <= m <= 12 and 1 <= d <= 28):
+        return dt.date(y, m, d).isoformat()
+    return f"{y:04d}-{m:02d}-{d:02d}"
 
 
 def fix_text(s: str) -> str:
@@ -75,10 +164,20 @@ def fix_text(s: str) -> str:
     if s is None:
         return ""
 
-    s = s.replace("\r", " ").replace("\n", " ")
-
+    # 快速路徑：大多數欄位本來就乾淨。isprintable() 為 False 的字元涵蓋 \r \n \xa0 \u3000 等
+    # 所有 str.split() 會切的空白（ASCII 空白除外），再排除頭尾/連續空白與亂碼特徵字元即可原樣回傳
+    if (
+        s.isprintable()
+        and "  " not in s
+        and s[:1] != " "
+        and s[-1:] != " "
+        and MOJIBAKE_CHARS.isdisjoint(s)
+    ):
+        return s
+
+    # 頁面已用 UTF-8 正確解碼，這段只是保險：先做便宜的特徵字元檢查，有疑似亂碼才跑 regex；
     # 若本來就含 CJK，通常不用救
-    if not re.search(r"[\u4e00-\u9fff]", s) and re.search(r"[ÃÂæåäèéçð]", s):
+    if not MOJIBAKE_CHARS.isdisjoint(s) and not CJK_RE.search(s):
         try:
             b = s.encode("latin1")  # 保留原 byte 值
             try:
@@ -87,19 +186,18 @@ def fix_text(s: str) -> str:
                 # 常見：尾端混入 \xa0（&nbsp;）導致 UTF-8 decode 失敗
                 cand = b.rstrip(b"\xa0").decode("utf-8", errors="strict")
 
-            if re.search(r"[\u4e00-\u9fff]", cand):
+            if CJK_RE.search(cand):
                 s = cand
         except Exception:
             pass
 
-    s = s.replace("\xa0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    # str.split() 會一併切掉 \r \n \xa0 與連續空白
+    return " ".join(s.split())
 
 
-def parse_page(content: bytes, base_date: dt.date, dt_days_ago: int, page: int) -> pd.DataFrame:
+def parse_page(content: bytes, base_date: dt.date) -> list:
     """
-    解析頁面：每筆曲目是一個 div.bxa2
+    解析頁面，回傳依 COLS 排列的 tuple 列表：每筆曲目是一個 div.bxa2
     典型順序：
       0 日期(MM/DD)
       1 播出時間(HH:MM)
@@ -109,102 +207,238 @@ def parse_page(content: bytes, base_date: dt.date, dt_days_ago: int, page: int)
       5 出版者（可能 hidden/空）
       6 CD編號（可能 hidden/空）
     """
-    soup = BeautifulSoup(content, "lxml")
+    tree = lxml_html.fromstring(content, parser=HTML_PARSER)
+    match_date = is_mmdd
+    match_time = is_hhmm
 
-    out = []
-    for div in soup.select("div.bxa2"):
-        children = div.find_all("div", recursive=False)
-        cells = [fix_text(c.get_text(" ", strip=False)) for c in children]
+    rows = []
+    for _, children in itertools.groupby(CELL_XPATH(tree), key=lambda c: c.getparent()):
+        cells = [fix_text(" ".join(c.itertext())) for c in children]
         if len(cells) < 4:
             continue
 
-        mmdd = cells[0]
-        tm = cells[1]
-
         # 若前兩格不是日期/時間（偶發版面多塞一個 div），就用 fallback 掃描
-        if not (DATE_MMDD_RE.match(mmdd) and TIME_RE.match(tm)):
-            mmdd = next((x for x in cells if DATE_MMDD_RE.match(x)), "")
-            if mmdd:
-                di = cells.index(mmdd)
-                tm = next((x for x in cells[di + 1 :] if TIME_RE.match(x)), "")
-            if not (mmdd and tm):
+        if match_date(cells[0]) and match_time(cells[1]):
+            di, ti = 0, 1
+        else:
+            di = next((i for i, x in enumerate(cells) if match_date(x)), -1)
+            if di < 0:
+                continue
+            ti = next((i for i in range(di + 1, len(cells)) if match_time(cells[i])), -1)
+            if ti < 0:
                 continue
 
-        date_iso = mmdd_to_iso(mmdd, base_date)
-
-        di = cells.index(mmdd)
-        ti = cells.index(tm, di + 1) if tm in cells[di + 1 :] else di + 1
-
-        song = cells[ti + 1] if ti + 1 < len(cells) else ""
-        artist = cells[ti + 2] if ti + 2 < len(cells) else ""
-        album = cells[ti + 3] if ti + 3 < len(cells) else ""
-        publisher = cells[ti + 4] if ti + 4 < len(cells) else ""
-        cdno = cells[ti + 5] if ti + 5 < len(cells) else ""
-
-        out.append(
-            {
-                "日期": date_iso,
-                "日期_mmdd": mmdd,
-                "播出時間": tm,
-                "歌曲名稱": song,
-                "演唱(奏)者": artist,
-                "專輯": album,
-                "出版者": publisher,
-                "CD編號": cdno,
-                "dt_days_ago": str(dt_days_ago),
-                "page": str(page),
-            }
-        )
+        mmdd = cells[di]
+        tm = cells[ti]
 
-    return pd.DataFrame(out)
+        # 歌曲名稱、演唱(奏)者、專輯、出版者、CD編號，缺的補空字串
+        fields = cells[ti + 1 : ti + 6]
+        fields += [""] * (5 - len(fields))
+        rows.append((mmdd_to_iso(mmdd, base_date), mmdd, tm, *fields))
 
+    return rows
 
-def fetch_dt_all_pages(dt_days_ago: int, max_pages: int, verify_ssl: bool) -> pd.DataFrame:
+
+def fetch_dt_all_pages(
+    dt_days_ago: int,
+    max_pages: int,
+    verify_ssl: bool,
+    debug: bool = False,
+    cache_dir: Path | None = None,
+    min_delay: float = 0.1,
+) -> pd.DataFrame:
     """
     分頁抓取：
       - dt=0（今天）：不要帶 dt 參數，只帶 p
       - dt>0：帶 dt=... 與 p
+    第 1 頁先單獨探測；之後每次並行抓 PAGE_WINDOW 頁，再依頁序解析；遇到空頁或短頁就停。
+    解析這一批時下一批已在背景下載，到尾頁時取消（最多浪費一批請求）。
+    批次間依伺服器回應時間調整間隔：max(min_delay, 0.5 * 最慢回應秒數)。
     """
     base_date = dt.date.today() - dt.timedelta(days=dt_days_ago)
-    dfs = []
-
-    for p in range(1, max_pages + 1):
+    windows = [range(1, 2)] if max_pages >= 1 else []
+    windows += [
+        range(start, min(start + PAGE_WINDOW, max_pages + 1))
+        for start in range(2, max_pages + 1, PAGE_WINDOW)
+    ]
+    rows = []
+    page_meta = []  # 每頁 (page, 列數, scraped_at)
+    seen = set()  # 抓取中資料會往下推，相鄰頁可能重複同一筆
+
+    def fetch_page(p: int) -> tuple:
         params = {"p": str(p)}
         if dt_days_ago > 0:
             params["dt"] = str(dt_days_ago)
+        return fetch_content(params, verify_ssl=verify_ssl, cache_dir=cache_dir)
+
+    with ThreadPoolExecutor(max_workers=PAGE_WINDOW) as ex:
+
+        def submit_window(i: int, delay: float) -> list:
+            if i >= len(windows):
+                return []
+            time.sleep(delay)
+            return [ex.submit(fetch_page, p) for p in windows[i]]
+
+        pending = submit_window(0, 0)
+        for i, pages in enumerate(windows):
+            results = [f.result() for f in pending]
+            contents = [content for content, _ in results]
+            delay = max(min_delay, 0.5 * max(elapsed for _, elapsed in results))
+
+            # 探測頁（i == 0）解析完、確定還有下一頁才開始抓後面
+            if i > 0:
+                pending = submit_window(i + 1, delay)
+
+            last_page = False
+            for p, content in zip(pages, contents):
+                # 除錯用：解析失敗、解析不到資料（或 --debug）時保留這次的 HTML
+                try:
+                    page_rows = parse_page(content, base_date)
+                except Exception:
+                    Path("debug_last.html").write_bytes(content)
+                    raise
+
+                if debug or not page_rows:
+                    Path("debug_last.html").write_bytes(content)
+
+                if not page_rows:
+                    if p == 1:
+                        raise RuntimeError("Parsed 0 rows on page 1 (see debug_last.html).")
+                    last_page = True
+                    break
+
+                kept = 0
+                for row in page_rows:
+                    key = ROW_KEY(row)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    rows.append(row)
+                    kept += 1
+                page_meta.append((str(p), kept, dt.datetime.now().isoformat(timespec="seconds")))
+
+                # 保守：若這頁資料很少，通常代表已到尾頁（以去重前的列數判斷）
+                if len(page_rows) < 5:
+                    last_page = True
+                    break
+
+            if last_page:
+                for f in pending:
+                    f.cancel()
+                break
+
+            if i == 0:
+                pending = submit_window(1, delay)
+
+    if not rows:
+        return pd.DataFrame()
+
+    # 所有頁累積完才建一次 DataFrame，再把每頁的 page / scraped_at 依列數展開
+    pages, counts, stamps = zip(*page_meta)
+    df = pd.DataFrame(rows, columns=COLS)
+    df["dt_days_ago"] = str(dt_days_ago)
+    df["page"] = np.repeat(pages, counts)
+    df["scraped_at"] = np.repeat(stamps, counts)
+    return df
+
+
+def read_table(path: Path, columns: list | None = None) -> pd.DataFrame:
+    """
+    讀回既有輸出，所有欄位都是字串；columns 只讀指定欄位。
+    CSV 有 pyarrow 時用 Arrow 的 C++ reader，但每欄都指定為 string：
+    pandas 的 engine="pyarrow" 即使 dtype=str 也會先推斷型別，把 "16:27" 讀成 "16:27:00"。
+    """
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+
+    if pa is not None:
+        header = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+        convert = pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in header},
+            strings_can_be_null=False,
+            include_columns=columns,
+        )
+        return pa_csv.read_csv(path, convert_options=convert).to_pandas()
 
-        content = fetch_content(params, verify_ssl=verify_ssl)
+    # keep_default_na=False：空欄保持 ""（與新抓的列一致），也不會把叫 "NA"、"None" 的歌名讀成 NaN
+    return pd.read_csv(path, usecols=columns, dtype=str, encoding="utf-8-sig", keep_default_na=False)
 
-        # 除錯用：永遠保留最後一次抓到的 HTML
-        Path("debug_last.html").write_bytes(content)
 
-        df = parse_page(content, base_date, dt_days_ago, p)
-        if df.empty:
-            if p == 1:
-                raise RuntimeError("Parsed 0 rows on page 1 (see debug_last.html).")
-            break
+def write_table(df: pd.DataFrame, path: Path) -> None:
+    """
+    依副檔名輸出：.parquet（需要 pyarrow，預設 Snappy 壓縮）或 UTF-8 BOM CSV（Excel 直接開不亂碼）。
+    """
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding="utf-8-sig")
 
-        df["scraped_at"] = dt.datetime.now().isoformat(timespec="seconds")
-        dfs.append(df)
 
-        # 保守：若這頁資料很少，通常代表已到尾頁
-        if len(df) < 5:
-            break
+def merge_dedupe(existing_path: Path, new_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    new_df 來自 fetch_dt_all_pages，欄位本來就全是字串，不必再 astype(str) 複製一份。
+    """
+    if existing_path.exists():
+        combined = pd.concat([read_table(existing_path), new_df], ignore_index=True)
+    else:
+        combined = new_df
 
-        time.sleep(0.6)
+    # combined 可能就是呼叫端的 new_df，不做 inplace
+    keys = [k for k in DEDUPE_KEYS if k in combined.columns]
+    return combined.drop_duplicates(subset=keys or None, keep="last", ignore_index=True)
 
-    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
 
+def key_hashes_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".hashes")
 
-def merge_dedupe(existing_path: Path, new_df: pd.DataFrame) -> pd.DataFrame:
-    if existing_path.exists():
-        old_df = pd.read_csv(existing_path, dtype=str, encoding="utf-8-sig")
-        combined = pd.concat([old_df, new_df.astype(str)], ignore_index=True)
+
+def csv_stamp(path: Path) -> str:
+    st = path.stat()
+    return f"{st.st_size} {st.st_mtime_ns}"
+
+
+def row_key_hash(values) -> str:
+    return hashlib.sha256("|".join(values).encode("utf-8")).hexdigest()
+
+
+def append_dedupe(out_path: Path, new_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    增量去重：<out>.hashes 第一行記 CSV 的大小與 mtime，之後每行一筆已寫入列的 DEDUPE_KEYS hash，
+    只把沒看過的新列 append 到 CSV，不必每次重讀整份歷史資料。
+    sidecar 不存在、或 CSV 被 git checkout/手動修改過（大小、mtime 對不上）時從現有 CSV 重建。
+    重複的列保留先寫入的那筆；要以新抓的列覆蓋舊列請用 --full-dedupe。回傳實際寫入的列。
+    """
+    hashes_path = key_hashes_path(out_path)
+
+    seen = None
+    if not out_path.exists():
+        seen = set()
+    elif hashes_path.exists():
+        stamp, _, hashes = hashes_path.read_text(encoding="utf-8").partition("\n")
+        if stamp == csv_stamp(out_path):
+            seen = set(hashes.split())
+    if seen is None:
+        old_keys = read_table(out_path, columns=DEDUPE_KEYS)
+        seen = {row_key_hash(k) for k in old_keys[DEDUPE_KEYS].itertuples(index=False, name=None)}
+
+    keep = []
+    for key in new_df[DEDUPE_KEYS].itertuples(index=False, name=None):
+        h = row_key_hash(key)
+        keep.append(h not in seen)
+        seen.add(h)
+    fresh = new_df[keep]
+
+    if out_path.exists():
+        # 依既有檔頭欄位順序接在檔尾（不能再寫一次 BOM）
+        header = pd.read_csv(out_path, nrows=0, encoding="utf-8-sig").columns
+        fresh.reindex(columns=header).to_csv(out_path, mode="a", header=False, index=False, encoding="utf-8")
     else:
-        combined = new_df.astype(str)
+        fresh.to_csv(out_path, index=False, encoding="utf-8-sig")
+
+    # CSV 寫完才記下新的大小/mtime
+    hashes_path.write_text(csv_stamp(out_path) + "\n" + "".join(h + "\n" for h in seen), encoding="utf-8")
 
-    keys = [k for k in ["日期", "播出時間", "歌曲名稱", "演唱(奏)者"] if k in combined.columns]
-    return combined.drop_duplicates(subset=keys, keep="last") if keys else combined.drop_duplicates(keep="last")
+    return fresh
 
 
 def main() -> None:
@@ -213,22 +447,66 @@ def main() -> None:
     ap.add_argument("--max-pages", type=int, default=50)
     ap.add_argument("--out", type=str, default="data/iradio_today.csv")
     ap.add_argument("--append-dedupe", action="store_true")
+    ap.add_argument(
+        "--full-dedupe",
+        action="store_true",
+        help=(
+            "With --append-dedupe: reload and rewrite the whole CSV instead of appending new rows; "
+            "only this path refreshes re-scraped rows (keeps the latest copy, plain append keeps the first)"
+        ),
+    )
+    ap.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="parquet replaces the --out suffix with .parquet (requires pyarrow)",
+    )
     ap.add_argument("--insecure", action="store_true", help="Disable SSL verification (public scraping only)")
+    ap.add_argument("--debug", action="store_true", help="Keep every fetched page in debug_last.html")
+    ap.add_argument(
+        "--http-cache",
+        type=str,
+        default=None,
+        help="Directory for ETag/Last-Modified validators and page bodies (conditional requests)",
+    )
+    ap.add_argument(
+        "--min-delay",
+        type=float,
+        default=0.1,
+        help="Minimum pause (s) between page batches; otherwise half the slowest response time",
+    )
     args = ap.parse_args()
 
     try:
-        df = fetch_dt_all_pages(args.dt, args.max_pages, verify_ssl=not args.insecure)
+        df = fetch_dt_all_pages(
+            args.dt,
+            args.max_pages,
+            verify_ssl=not args.insecure,
+            debug=args.debug,
+            cache_dir=Path(args.http_cache) if args.http_cache else None,
+            min_delay=args.min_delay,
+        )
         if df.empty:
             raise RuntimeError("Parsed 0 rows from all pages (see debug_last.html).")
 
         out_path = Path(args.out)
+        if args.format == "parquet":
+            out_path = out_path.with_suffix(".parquet")
         out_path.parent.mkdir(parents=True, exist_ok=True)
 
+        # Parquet 無法 append，一律走整份合併重寫
+        if args.append_dedupe and not args.full_dedupe and args.format == "csv":
+            added = append_dedupe(out_path, df)
+            print(f"Saved: {out_path} rows={len(df)} new={len(added)}")
+            return
+
         if args.append_dedupe:
-            df2 = merge_dedupe(out_path, df)
-            df2.to_csv(out_path, index=False, encoding="utf-8-sig")
+            write_table(merge_dedupe(out_path, df), out_path)
         else:
-            df.to_csv(out_path, index=False, encoding="utf-8-sig")
+            write_table(df, out_path)
+
+        # 整份重寫後 sidecar 已不準，下次增量時會從 CSV 重建
+        key_hashes_path(out_path).unlink(missing_ok=True)
 
         print(f"Saved: {out_path} rows={len(df)}")
 